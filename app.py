@@ -3,9 +3,15 @@ main.py
 -------
 TTS Microservice using Microsoft Edge TTS (fast, ~300ms latency).
 
-Every POST /tts saves 2 files automatically:
-  storage/audio/  → speech-<id>.mp3      (the audio file)
-  storage/logs/   → request-<id>.json    (everything about this request)
+Every POST /tts saves its audio and a log record automatically:
+  storage/audio/  → <id[:2]>/speech-<id>.mp3   (the audio file)
+  storage/logs/   → requests.jsonl              (one line per request, written in batches)
+
+Audio is streamed to the client chunk by chunk as Edge TTS produces it,
+then saved to storage/audio/ in one write once synthesis has finished.
+
+Repeated (text, lang) pairs are served from the audio cache (cache.py)
+without calling Edge TTS — the response carries X-Cache: HIT.
 
 Endpoints:
   GET  /health    — Is the service running?
@@ -14,27 +20,42 @@ Endpoints:
   GET  /dashboard — Summary of saved files
 """
 
+import os
 import uuid
 import time
+import asyncio
 import signal
 from pathlib import Path
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, HTTPException, Response
 from fastapi.responses import StreamingResponse, JSONResponse
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
-from logger import save_request_log, trace_id_var, LOGS_DIR
-from metrics import REQUEST_COUNT, REQUEST_LATENCY, ERROR_COUNT, AUDIO_SIZE, get_metrics_output
-from tts_engine import text_to_speech, VOICE_MAP
+from cache import audio_cache, cache_key
+from logger import save_request_log, start_log_flusher, stop_log_flusher, count_log_records, trace_id_var, LOGS_DIR
+from metrics import REQUEST_COUNT_OK, REQUEST_COUNT_BY_STATUS, REQUEST_LATENCY, ERROR_COUNT, AUDIO_SIZE, CACHE_HITS, SAVED_LOGS, SAVED_AUDIO, get_metrics_output
+from tts_engine import stream_speech, text_to_speech, is_overloaded, open_session, close_session, VOICE_MAP
 
 # ── Storage ───────────────────────────────────────────────────────────────────
 
 AUDIO_DIR = Path("storage/audio")
 AUDIO_DIR.mkdir(parents=True, exist_ok=True)
 
+# MP3s go into one sub-folder per 2-hex-char request ID prefix (00/ … ff/),
+# so no single folder grows past a few thousand files
+for shard in range(256):
+    (AUDIO_DIR / f"{shard:02x}").mkdir(exist_ok=True)
+
 START_TIME       = time.time()
 is_shutting_down = False
+shutdown_started = asyncio.Event()  # same as is_shutting_down, for code that awaits it
+
+# Per-request console output is off by default — print() is costly at high request rates
+DEBUG = os.getenv("DEBUG", "0") == "1"
+
+WARMUP_TIMEOUT = 10  # seconds
+DRAIN_TIMEOUT  = 30  # seconds to let detached syntheses finish at shutdown
 
 
 # ── Startup & Shutdown ────────────────────────────────────────────────────────
@@ -45,12 +66,55 @@ async def lifespan(app: FastAPI):
     print(f"[INFO] Logs   → {LOGS_DIR.resolve()}")
     print(f"[INFO] Audio  → {AUDIO_DIR.resolve()}")
 
-    def on_shutdown(*args):
+    loop             = asyncio.get_running_loop()
+    previous_sigterm = signal.getsignal(signal.SIGTERM)
+
+    def on_shutdown(signum, frame):
         global is_shutting_down
         is_shutting_down = True
+        loop.call_soon_threadsafe(shutdown_started.set)
+        # Hand the signal on to the server's own handler (uvicorn's), so it still
+        # stops and the shutdown half of this lifespan runs
+        if callable(previous_sigterm):
+            previous_sigterm(signum, frame)
 
     signal.signal(signal.SIGTERM, on_shutdown)
+
+    # Count what's already on disk once — after this /tts keeps the totals up to date
+    SAVED_LOGS.total  = count_log_records()
+    SAVED_AUDIO.total = len(list(AUDIO_DIR.glob("**/*.mp3")))
+
+    # Bring back cached audio from the last run (and trim the cache folder to its limits)
+    await audio_cache.load()
+
+    start_log_flusher()
+    await open_session()
+
+    # One throwaway synthesis, so the first real request doesn't pay for the
+    # first DNS lookup (kept in the shared pool) and edge_tts' lazy imports —
+    # failure never blocks startup
+    try:
+        await asyncio.wait_for(text_to_speech("warmup", "en"), timeout=WARMUP_TIMEOUT)
+        print("[INFO] Edge TTS warm-up done")
+    except Exception as e:
+        print(f"[WARN] Edge TTS warm-up failed: {e!r}")
+
     yield
+
+    # Let syntheses whose clients already left finish saving their audio,
+    # cache entry and log record before the writers below are stopped
+    if _background_tasks:
+        print(f"[INFO] Waiting for {len(_background_tasks)} synthesis(es) to finish")
+        _, unfinished = await asyncio.wait(_background_tasks, timeout=DRAIN_TIMEOUT)
+        for task in unfinished:
+            task.cancel()
+        if unfinished:
+            print(f"[WARN] Gave up on {len(unfinished)} synthesis(es) after {DRAIN_TIMEOUT}s")
+            await asyncio.gather(*unfinished, return_exceptions=True)
+
+    await close_session()
+    await audio_cache.close()
+    await stop_log_flusher()
     print("[INFO] Service stopped")
 
 
@@ -68,6 +132,81 @@ class TTSRequest(BaseModel):
         description=f"Language code. Options: {list(VOICE_MAP.keys())}"
     )
 
+    @field_validator("lang")
+    @classmethod
+    def known_lang(cls, lang: str) -> str:
+        # Unknown codes are rejected with a 422 before any call to Edge TTS
+        if lang not in VOICE_MAP:
+            raise ValueError(f"Unknown language code. Options: {list(VOICE_MAP.keys())}")
+        return lang
+
+
+# ── Request Bookkeeping ───────────────────────────────────────────────────────
+
+_timestamp_cache: tuple[int, str] = (0, "")  # (second, formatted)
+
+
+def format_timestamp(now: float) -> str:
+    """Log timestamp for now — only re-formatted when the second changes."""
+    global _timestamp_cache
+    second = int(now)
+    if second != _timestamp_cache[0]:
+        _timestamp_cache = (second, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second)))
+    return _timestamp_cache[1]
+
+
+def record_success(request_id: str, timestamp: str, request: TTSRequest,
+                   latency_ms: float, audio_file: str, audio: bytes, cache_hit: bool):
+    """Update Prometheus counters and save the JSON log for a finished request."""
+    audio_len = len(audio)
+    size_kb   = round(audio_len / 1024, 1)
+
+    REQUEST_COUNT_OK.inc()
+    # Hits take ~0 ms and are counted by CACHE_HITS — observing them here
+    # would drag the synthesis-latency percentiles toward zero
+    if not cache_hit:
+        REQUEST_LATENCY.observe(latency_ms / 1000)
+    AUDIO_SIZE.observe(audio_len)
+
+    save_request_log({
+        "request_id":    request_id,
+        "timestamp":     timestamp,
+        "input_text":    request.text,
+        "language":      request.lang,
+        "status":        "success",
+        "error":         None,
+        "latency_ms":    latency_ms,
+        "audio_file":    audio_file,
+        "audio_size_kb": size_kb,
+        "cache_hit":     cache_hit,
+    })
+
+    if DEBUG:
+        print(f"[AUDIO] Saved  → {audio_file}  ({size_kb} KB)")
+        print(f"[DONE]  {request_id} completed in {latency_ms}ms\n")
+
+
+def record_failure(request_id: str, timestamp: str, request: TTSRequest,
+                   start_time: float, error: Exception):
+    """Count the error and save the JSON log for a failed request."""
+    latency_ms = round((time.time() - start_time) * 1000, 2)
+
+    save_request_log({
+        "request_id":    request_id,
+        "timestamp":     timestamp,
+        "input_text":    request.text,
+        "language":      request.lang,
+        "status":        "failed",
+        "error":         str(error),
+        "latency_ms":    latency_ms,
+        "audio_file":    None,
+        "audio_size_kb": None,
+        "cache_hit":     False,
+    })
+
+    REQUEST_COUNT_BY_STATUS["500"].inc()
+    ERROR_COUNT.inc()
+
 
 # ── Endpoints ─────────────────────────────────────────────────────────────────
 
@@ -83,83 +222,167 @@ async def health():
     }
 
 
+_background_tasks: set[asyncio.Task] = set()
+
+
+def start_background(coro) -> asyncio.Task:
+    """Run coro as a task that can't be garbage-collected before it finishes."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+class ShuttingDown(Exception):
+    """Raised when the service starts shutting down before synthesis got going."""
+
+
+async def first_chunk_unless_shutdown(chunks) -> bytes:
+    """
+    Wait for the first chunk of chunks — this includes the wait for an Edge TTS slot.
+    Gives up with ShuttingDown if shutdown starts first, so requests that queued
+    behind busy slots don't hold up the drain of the ones already streaming.
+    """
+    first   = asyncio.ensure_future(anext(chunks))
+    stopped = asyncio.ensure_future(shutdown_started.wait())
+    try:
+        await asyncio.wait({first, stopped}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        stopped.cancel()
+        if not first.done():
+            first.cancel()
+            await asyncio.gather(first, return_exceptions=True)
+
+    if first.cancelled():
+        raise ShuttingDown
+    return first.result()
+
+
 @app.post("/tts", tags=["TTS"])
 async def tts(request: TTSRequest):
     """
     Convert text to speech using Edge TTS (~300ms latency).
-    Saves one MP3 and one JSON log file per request.
+    Audio is streamed to the client as Edge TTS produces it.
+    Saves one MP3 and one JSON log record per request.
     """
     if is_shutting_down:
+        REQUEST_COUNT_BY_STATUS["503"].inc()
         raise HTTPException(status_code=503, detail="Service is shutting down")
 
     # Step 1: Assign unique ID to this request
-    request_id = str(uuid.uuid4())[:8]
+    request_id = uuid.uuid4().hex[:8]
     trace_id_var.set(request_id)
     start_time = time.time()
-    timestamp  = time.strftime("%Y-%m-%d %H:%M:%S")
+    timestamp  = format_timestamp(start_time)
+
+    if DEBUG:
+        print(f"\n[REQUEST {request_id}] '{request.text[:60]}' | lang={request.lang}")
+
+    filename   = f"speech-{request_id}.mp3"
+    audio_file = f"{request_id[:2]}/{filename}"  # relative to storage/audio/
+    audio_path = AUDIO_DIR / audio_file
+    headers    = {
+        "Content-Disposition": f"attachment; filename={filename}",
+        "X-Request-ID":        request_id,
+    }
 
-    print(f"\n[REQUEST {request_id}] '{request.text[:60]}' | lang={request.lang}")
+    # Step 2: Reuse cached audio if this text was spoken before
+    key   = cache_key(request.text, request.lang)
+    audio = await audio_cache.get(key)
 
-    # Step 2: Convert text to audio (await — no asyncio.run needed)
+    if audio is not None:
+        CACHE_HITS.inc()
+        latency_ms = round((time.time() - start_time) * 1000, 2)
+
+        # One worker-thread hop covers open + write + close
+        await asyncio.to_thread(audio_path.write_bytes, audio)
+        SAVED_AUDIO.inc()
+        record_success(request_id, timestamp, request, latency_ms, audio_file, audio, cache_hit=True)
+
+        # Audio is already in memory — a plain Response sends it in one message
+        return Response(
+            content=audio,
+            media_type="audio/mpeg",
+            headers={**headers, "X-Latency-Ms": str(latency_ms), "X-Cache": "HIT"},
+        )
+
+    # Step 3: Fail fast when Edge TTS is saturated — queueing more would only add latency
+    if is_overloaded():
+        REQUEST_COUNT_BY_STATUS["503"].inc()
+        raise HTTPException(status_code=503, detail="Too many requests in progress, try again shortly")
+
+    # Start Edge TTS and wait for the first chunk,
+    # so a failed synthesis still returns a 500 instead of an empty 200
+    chunks = stream_speech(request.text, request.lang)
     try:
-        audio = await text_to_speech(request.text, request.lang)
+        first_chunk = await first_chunk_unless_shutdown(chunks)
+    except ShuttingDown:
+        await chunks.aclose()
+        REQUEST_COUNT_BY_STATUS["503"].inc()
+        raise HTTPException(status_code=503, detail="Service is shutting down")
     except Exception as e:
+        record_failure(request_id, timestamp, request, start_time, e)
+        raise HTTPException(status_code=500, detail="Audio generation failed")
+    except BaseException:
+        # Cancelled while waiting (shutdown, client gone) — close the engine stream
+        # so its Edge TTS slots are given back before the cancellation propagates
+        await chunks.aclose()
+        raise
+
+    # Time to first byte — the rest of the audio follows while the client plays it
+    first_byte_ms = round((time.time() - start_time) * 1000, 2)
+
+    # Step 4: Drain Edge TTS in its own task, so synthesis time (and the Edge TTS
+    # slots) don't depend on how fast the client downloads
+    buf     = bytearray(first_chunk)
+    pending = asyncio.Queue()  # chunks for relay(), then None — or the synthesis error
+
+    async def pump():
+        try:
+            async for chunk in chunks:
+                buf.extend(chunk)
+                pending.put_nowait(chunk)
+        except Exception as e:
+            record_failure(request_id, timestamp, request, start_time, e)
+            pending.put_nowait(e)
+            return
+        finally:
+            await chunks.aclose()
+
+        # Synthesis time only — the client may still be downloading
         latency_ms = round((time.time() - start_time) * 1000, 2)
+        pending.put_nowait(None)
 
-        # Save log for failed request
-        save_request_log({
-            "request_id":    request_id,
-            "timestamp":     timestamp,
-            "input_text":    request.text,
-            "language":      request.lang,
-            "status":        "failed",
-            "error":         str(e),
-            "latency_ms":    latency_ms,
-            "audio_file":    None,
-            "audio_size_kb": None,
-        })
-
-        ERROR_COUNT.inc()
-        raise HTTPException(status_code=500, detail="Audio generation failed")
+        try:
+            await finish(latency_ms)
+        except Exception as e:
+            print(f"[ERROR] Failed to save audio for {request_id}: {e}")
 
-    # Step 3: Measure how long it took
-    latency_ms = round((time.time() - start_time) * 1000, 2)
+    # Step 5: Forward each chunk to the client as soon as Edge TTS produces it
+    async def relay():
+        yield first_chunk
+        while (item := await pending.get()) is not None:
+            if isinstance(item, Exception):
+                raise item
+            yield item
 
-    # Step 4: Save MP3 to storage/audio/
-    filename   = f"speech-{request_id}.mp3"
-    audio_path = AUDIO_DIR / filename
-    audio_path.write_bytes(audio)
-    print(f"[AUDIO] Saved  → {filename}  ({round(len(audio)/1024, 1)} KB)")
+    # Step 6: Once synthesis is done, save the MP3 in a single write,
+    # cache the audio and record the request — even if the client left early
+    async def finish(latency_ms: float):
+        audio = bytes(buf)
 
-    # Step 5: Update Prometheus counters
-    REQUEST_COUNT.labels(status="200").inc()
-    REQUEST_LATENCY.observe(latency_ms / 1000)
-    AUDIO_SIZE.observe(len(audio))
+        await asyncio.to_thread(audio_path.write_bytes, audio)
+        SAVED_AUDIO.inc()
 
-    # Step 6: Save one merged JSON log with everything
-    save_request_log({
-        "request_id":    request_id,
-        "timestamp":     timestamp,
-        "input_text":    request.text,
-        "language":      request.lang,
-        "status":        "success",
-        "error":         None,
-        "latency_ms":    latency_ms,
-        "audio_file":    filename,
-        "audio_size_kb": round(len(audio) / 1024, 1),
-    })
+        await audio_cache.put(key, audio)
+        record_success(request_id, timestamp, request, latency_ms, audio_file, audio, cache_hit=False)
 
-    print(f"[DONE]  {request_id} completed in {latency_ms}ms\n")
+    start_background(pump())
 
-    # Step 7: Return audio as download
     return StreamingResponse(
-        iter([audio]),
+        relay(),
         media_type="audio/mpeg",
-        headers={
-            "Content-Disposition": f"attachment; filename={filename}",
-            "X-Request-ID":        request_id,
-            "X-Latency-Ms":        str(latency_ms),
-        }
+        headers={**headers, "X-Latency-Ms": str(first_byte_ms), "X-Cache": "MISS"},
     )
 
 
@@ -173,16 +396,13 @@ async def metrics():
 @app.get("/dashboard", tags=["Observability"])
 async def dashboard():
     """Summary of all saved files and uptime."""
-    log_files   = list(LOGS_DIR.glob("*.json"))
-    audio_files = list(AUDIO_DIR.glob("*.mp3"))
-
     return JSONResponse({
         "service":        "TTS Microservice",
         "engine":         "Microsoft Edge TTS",
         "status":         "shutting_down" if is_shutting_down else "running",
         "uptime_seconds": round(time.time() - START_TIME, 1),
         "saved": {
-            "logs":  {"total": len(log_files),   "folder": str(LOGS_DIR.resolve())},
-            "audio": {"total": len(audio_files), "folder": str(AUDIO_DIR.resolve())},
+            "logs":  {"total": SAVED_LOGS.total,  "folder": str(LOGS_DIR.resolve())},
+            "audio": {"total": SAVED_AUDIO.total, "folder": str(AUDIO_DIR.resolve())},
         }
     })
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""
+cache.py
+--------
+In-memory LRU cache for generated audio, so repeated (text, lang) pairs
+skip the Edge TTS round-trip entirely.
+
+Each entry is also written to storage/cache/<hash[:2]>/<hash>.mp3 so the cache
+survives a restart. The folder always mirrors what's in memory: evicting an
+entry deletes its sidecar, and load() at startup reads back the newest
+sidecars that fit the limits and deletes the rest.
+
+Sidecar writes and deletes are done by one background task (started by
+load(), stopped by close()), so get() and put() never wait on the disk.
+
+Limits (memory and disk alike):
+  MAX_ENTRIES → 1024 clips
+  MAX_BYTES   → 64 MB of audio
+"""
+
+import asyncio
+import hashlib
+from collections import OrderedDict
+from pathlib import Path
+
+# Create cache folder if it doesn't exist
+CACHE_DIR = Path("storage/cache")
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+MAX_ENTRIES = 1024
+MAX_BYTES   = 64 * 1024 * 1024
+
+
+def cache_key(text: str, lang: str) -> str:
+    """Stable key for one (lang, text) pair — also used as the sidecar file name."""
+    return hashlib.blake2b(f"{lang}:{text}".encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _sidecar_path(key: str) -> Path:
+    # Sharded by the first two hex chars of the key, like storage/audio/
+    return CACHE_DIR / key[:2] / f"{key}.mp3"
+
+
+def _write_sidecar(key: str, audio: bytes, evicted: list[str]):
+    path = _sidecar_path(key)
+    path.parent.mkdir(exist_ok=True)
+    path.write_bytes(audio)
+
+    for old_key in evicted:
+        _sidecar_path(old_key).unlink(missing_ok=True)
+
+
+class AudioCache:
+    """
+    LRU of MP3 bytes, bounded by entry count and total bytes.
+    Safe to share between coroutines — dict updates happen under an asyncio.Lock.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes   = max_bytes
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = asyncio.Lock()
+
+        # (key, audio, evicted keys) per put, then None — drained by _writer() in order
+        self._writes: asyncio.Queue = asyncio.Queue()
+        self._writer_task: asyncio.Task | None = None
+
+    async def load(self):
+        """Read sidecars left by an earlier run back into memory and start the sidecar writer. Call once at startup."""
+        loaded = await asyncio.to_thread(self._load_sidecars)
+
+        async with self._lock:
+            for key, audio in loaded:
+                self._entries[key] = audio
+                self._total_bytes += len(audio)
+
+        self._writer_task = asyncio.create_task(self._writer())
+
+    async def close(self):
+        """Finish any sidecar writes still queued, then stop the writer. Call once at shutdown."""
+        if self._writer_task is None:
+            return
+        self._writes.put_nowait(None)  # sentinel — tells the writer to finish up
+        await self._writer_task
+        self._writer_task = None
+
+    async def get(self, key: str) -> bytes | None:
+        """Return cached audio for key, or None on a miss."""
+        async with self._lock:
+            audio = self._entries.get(key)
+            if audio is not None:
+                self._entries.move_to_end(key)
+            return audio
+
+    async def put(self, key: str, audio: bytes):
+        """Store audio in memory and queue its sidecar file, evicting old entries if needed."""
+        # Clips bigger than the whole budget aren't cached at all
+        if len(audio) > self.max_bytes:
+            return
+
+        # Only memory is touched under the lock. The disk work is queued in the
+        # same order, so the writer leaves the folder matching memory
+        async with self._lock:
+            evicted = self._insert(key, audio)
+            self._writes.put_nowait((key, audio, evicted))
+
+    async def _writer(self):
+        while (item := await self._writes.get()) is not None:
+            try:
+                await asyncio.to_thread(_write_sidecar, *item)
+            except Exception as e:
+                # Never let one bad write kill the writer — later puts still need it
+                print(f"[ERROR] Failed to write cache sidecar {item[0]}: {e}")
+
+    def _insert(self, key: str, audio: bytes) -> list[str]:
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._total_bytes -= len(old)
+
+        self._entries[key] = audio
+        self._total_bytes += len(audio)
+
+        # Evict least recently used entries until we're back under both limits
+        evicted = []
+        while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+            old_key, old_audio = self._entries.popitem(last=False)
+            self._total_bytes -= len(old_audio)
+            evicted.append(old_key)
+        return evicted
+
+    def _load_sidecars(self) -> list[tuple[str, bytes]]:
+        # Newest first by write time — recency of hits isn't kept across restarts
+        sidecars = [(p.stat(), p) for p in CACHE_DIR.glob("*/*.mp3")]
+        sidecars.sort(key=lambda item: item[0].st_mtime, reverse=True)
+
+        kept, total = [], 0
+        for stat, path in sidecars:
+            if len(kept) < self.max_entries and total + stat.st_size <= self.max_bytes:
+                kept.append(path)
+                total += stat.st_size
+            else:
+                path.unlink(missing_ok=True)
+
+        # Oldest first, so the LRU order in memory matches
+        return [(path.stem, path.read_bytes()) for path in reversed(kept)]
+
+
+# One shared cache for the whole service
+audio_cache = AudioCache()
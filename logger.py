@@ -1,9 +1,9 @@
 """
 logger.py
 ---------
-Saves one JSON file per TTS request to storage/logs/.
+Saves one JSON record per TTS request to storage/logs/requests.jsonl.
 
-Each file contains everything in one place:
+Each record contains everything in one place:
   - request_id, timestamp
   - input_text, language
   - status, error
@@ -11,13 +11,24 @@ Each file contains everything in one place:
   - audio_file name
 
 No separate metrics file needed anymore — it's all here.
+
+Records are queued and written in batches by one background task
+(start_log_flusher / stop_log_flusher, driven by the app lifespan), so a
+burst of requests costs one file append per batch instead of one file each.
+
+Set LOG_PER_REQUEST_FILES=1 to also write one <id[:2]>/request-<id>.json file per request.
 """
 
-import json
+import asyncio
+import os
 import time
 from pathlib import Path
 from contextvars import ContextVar
 
+import orjson
+
+from metrics import SAVED_LOGS
+
 # Holds the unique ID for the current request
 trace_id_var: ContextVar[str] = ContextVar("trace_id", default="no-trace")
 
@@ -25,16 +36,105 @@ trace_id_var: ContextVar[str] = ContextVar("trace_id", default="no-trace")
 LOGS_DIR = Path("storage/logs")
 LOGS_DIR.mkdir(parents=True, exist_ok=True)
 
+LOG_FILE          = LOGS_DIR / "requests.jsonl"
+PER_REQUEST_FILES = os.getenv("LOG_PER_REQUEST_FILES", "0") == "1"
+
+# Flush when this many records are waiting, or this long after the first one
+BATCH_SIZE     = 128
+FLUSH_INTERVAL = 0.2  # seconds
+
+_queue: asyncio.Queue = asyncio.Queue()
+_flusher_task: asyncio.Task | None = None
+_stopped = False  # set by stop_log_flusher — later records are written directly
+
 
 def save_request_log(data: dict):
     """
-    Save all request details into one clean JSON file.
-    File is named: request-<request_id>.json
+    Queue all request details for the background flusher.
+    Returns immediately — the record reaches storage/logs/ within FLUSH_INTERVAL.
     """
-    request_id = data.get("request_id", "unknown")
-    log_file   = LOGS_DIR / f"request-{request_id}.json"
+    if _stopped:
+        # Nothing drains the queue any more, so write this one straight away
+        print(f"[WARN] Log flusher already stopped — writing record {data.get('request_id')} directly")
+        _write_batch_sync([data])
+        SAVED_LOGS.inc()
+        return
+    _queue.put_nowait(data)
+
+
+def count_log_records() -> int:
+    """Number of request records saved in storage/logs/ so far. Scans the folder — startup only."""
+    total = len(list(LOGS_DIR.glob("**/request-*.json")))
+    if LOG_FILE.exists() and not PER_REQUEST_FILES:
+        with open(LOG_FILE, "rb") as f:
+            total += sum(1 for _ in f)
+    return total
+
+
+def start_log_flusher():
+    """Start the background task that writes queued records. Call once at startup."""
+    global _flusher_task
+    _flusher_task = asyncio.create_task(_flusher())
+
+
+async def stop_log_flusher():
+    """Write any records still queued, then stop the flusher. Call once at shutdown."""
+    global _stopped
+    if _flusher_task is None:
+        return
+    _stopped = True
+    _queue.put_nowait(None)  # sentinel — tells the flusher to finish up
+    await _flusher_task
+
+
+async def _flusher():
+    loop = asyncio.get_running_loop()
+
+    while True:
+        # Wait for the first record, then collect more until the batch is full or time is up
+        record = await _queue.get()
+        if record is None:
+            return
+
+        batch    = [record]
+        deadline = loop.time() + FLUSH_INTERVAL
+        stopping = False
+
+        while len(batch) < BATCH_SIZE:
+            try:
+                record = await asyncio.wait_for(_queue.get(), deadline - loop.time())
+            except TimeoutError:
+                break
+            if record is None:
+                stopping = True
+                break
+            batch.append(record)
+
+        try:
+            await _write_batch(batch)
+        except Exception as e:
+            # Never let one bad write kill the flusher — later batches still need it
+            print(f"[ERROR] Failed to write {len(batch)} log record(s): {e}")
+
+        if stopping:
+            return
+
+
+async def _write_batch(batch: list[dict]):
+    """Write a batch of records from a worker thread — one thread hop per batch."""
+    await asyncio.to_thread(_write_batch_sync, batch)
+    SAVED_LOGS.inc(len(batch))
+    print(f"[LOG] Saved {len(batch)} record(s) → {LOG_FILE.name}")
+
 
-    with open(log_file, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+def _write_batch_sync(batch: list[dict]):
+    # orjson serializes straight to UTF-8 bytes, so the file is opened in binary mode
+    with open(LOG_FILE, "ab") as f:
+        f.write(b"".join(orjson.dumps(r) + b"\n" for r in batch))
 
-    print(f"[LOG] Saved → {log_file.name}")
\ No newline at end of file
+    if PER_REQUEST_FILES:
+        for data in batch:
+            request_id = data.get("request_id", "unknown")
+            log_file   = LOGS_DIR / request_id[:2] / f"request-{request_id}.json"  # sharded like storage/audio/
+            log_file.parent.mkdir(exist_ok=True)
+            log_file.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
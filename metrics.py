@@ -5,7 +5,16 @@ Prometheus counters for the /metrics endpoint.
 These are used internally — the actual saved file is handled by logger.py.
 """
 
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+import threading
+import time
+
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+
+# Rendered /metrics output is reused for this long, so several scrapers share one render
+METRICS_CACHE_SECONDS = 5.0
+
+# Only these status values are ever used as labels — each one is its own time series
+_STATUS_ALLOWED = ("200", "500", "503")
 
 REQUEST_COUNT = Counter(
     "tts_requests_total",
@@ -13,10 +22,15 @@ REQUEST_COUNT = Counter(
     ["status"]
 )
 
+# Label children are created once here, so the hot path skips the .labels() lookup
+REQUEST_COUNT_BY_STATUS = {status: REQUEST_COUNT.labels(status=status) for status in _STATUS_ALLOWED}
+REQUEST_COUNT_OK        = REQUEST_COUNT_BY_STATUS["200"]
+
 REQUEST_LATENCY = Histogram(
     "tts_latency_seconds",
-    "Request latency in seconds",
-    buckets=[0.1, 0.3, 0.5, 1.0, 2.0]
+    "Synthesis latency in seconds (cache misses only)",
+    # Edge TTS usually answers in ~300ms, so most buckets sit around that
+    buckets=[0.15, 0.25, 0.35, 0.5, 0.75, 1.0, 2.0, 5.0]
 )
 
 ERROR_COUNT = Counter(
@@ -24,6 +38,11 @@ ERROR_COUNT = Counter(
     "Total failed requests"
 )
 
+CACHE_HITS = Counter(
+    "tts_cache_hits_total",
+    "Requests served from the audio cache"
+)
+
 AUDIO_SIZE = Histogram(
     "tts_audio_bytes",
     "Generated audio size in bytes",
@@ -31,6 +50,40 @@ AUDIO_SIZE = Histogram(
 )
 
 
+class FileCounter:
+    """
+    Running count of saved files, so /dashboard never has to scan a folder.
+    Exposed on /metrics as a gauge; set total once at startup, then inc() per file.
+    """
+
+    def __init__(self, name: str, documentation: str):
+        self.total = 0
+        Gauge(name, documentation).set_function(lambda: self.total)
+
+    def inc(self, amount: int = 1):
+        self.total += amount
+
+
+SAVED_LOGS  = FileCounter("tts_saved_log_records", "Request log records saved to storage/logs/")
+SAVED_AUDIO = FileCounter("tts_saved_audio_files", "MP3 files saved to storage/audio/")
+
+
+_metrics_cache: tuple[float, bytes] = (0.0, b"")  # (expiry, rendered output)
+_metrics_lock  = threading.Lock()
+
+
 def get_metrics_output():
-    """Return Prometheus metrics for GET /metrics endpoint."""
-    return generate_latest(), CONTENT_TYPE_LATEST
\ No newline at end of file
+    """
+    Return Prometheus metrics for GET /metrics endpoint.
+    Output is rendered at most once every METRICS_CACHE_SECONDS.
+    """
+    global _metrics_cache
+
+    with _metrics_lock:
+        expiry, data = _metrics_cache
+        now = time.monotonic()
+        if now >= expiry:
+            data = generate_latest()
+            _metrics_cache = (now + METRICS_CACHE_SECONDS, data)
+
+    return data, CONTENT_TYPE_LATEST
\ No newline at end of file
@@ -16,8 +16,12 @@ Supported language codes:
   "es"   → Spanish Female
 """
 
-import tempfile
+import asyncio
 import os
+import re
+from typing import AsyncIterator
+
+import aiohttp
 import edge_tts
 
 # Map simple codes to Edge TTS voice names
@@ -33,6 +37,145 @@ VOICE_MAP = {
 
 DEFAULT_VOICE = "en-US-AriaNeural"
 
+# Texts longer than this are split into sentences and synthesized concurrently
+PARALLEL_MIN_CHARS     = 200
+MAX_PARALLEL_SENTENCES = 8  # Edge TTS calls in flight per request
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_HAS_WORD     = re.compile(r"\w")
+
+# Every Edge TTS call (one per sentence for long texts) takes one of
+# TTS_MAX_CONCURRENCY slots shared by the whole process
+TTS_MAX_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", "32"))
+TTS_MAX_WAITING     = int(os.getenv("TTS_MAX_WAITING", "64"))
+
+_synthesis_slots = asyncio.Semaphore(TTS_MAX_CONCURRENCY)
+_waiting         = 0  # calls queued for a slot
+
+
+def is_overloaded() -> bool:
+    """True when every Edge TTS slot is busy and TTS_MAX_WAITING calls are already queued."""
+    return _synthesis_slots.locked() and _waiting >= TTS_MAX_WAITING
+
+
+# ── Shared connection pool ────────────────────────────────────────────────────
+
+class _SharedConnector(aiohttp.TCPConnector):
+    """
+    TCPConnector that survives the ClientSession edge_tts opens for every call.
+    edge_tts closes its session (and with it the connector) when synthesis ends,
+    so close() is a no-op here — shutdown() is the real close.
+    """
+
+    async def close(self, *, abort_ssl: bool = False):
+        return None
+
+    async def shutdown(self):
+        await super().close()
+
+
+_connector: _SharedConnector | None = None
+
+
+async def open_session():
+    """Create the connection pool shared by all Edge TTS calls. Call once at startup."""
+    global _connector
+    # limit=0: no pool-wide cap of its own — _synthesis_slots already bounds the
+    # calls, and a second, silent limit would queue them with no timeout
+    _connector = _SharedConnector(limit=0, ttl_dns_cache=300)
+
+
+async def close_session():
+    """Close the shared connection pool. Call once at shutdown."""
+    global _connector
+    if _connector is not None:
+        await _connector.shutdown()
+        _connector = None
+
+
+async def stream_speech(text: str, lang: str = "en") -> AsyncIterator[bytes]:
+    """
+    Yield MP3 chunks as Edge TTS produces them.
+    Use this when the audio can be forwarded before synthesis is finished:
+        async for chunk in stream_speech(...)
+
+    Args:
+        text: The text to speak.
+        lang: Language code from VOICE_MAP above.
+
+    Yields:
+        MP3 audio bytes, a few KB at a time.
+        Long multi-sentence texts yield one sentence of audio at a time, in order.
+    """
+    voice     = VOICE_MAP.get(lang, DEFAULT_VOICE)
+    sentences = split_sentences(text) if len(text) > PARALLEL_MIN_CHARS else [text]
+
+    if len(sentences) < 2:
+        async for chunk in _stream_voice(text, voice):
+            yield chunk
+        return
+
+    # Synthesize all sentences at once (bounded by the semaphore) — MP3 frames
+    # are independent, so the parts can simply be sent back to back
+    sem   = asyncio.Semaphore(MAX_PARALLEL_SENTENCES)
+    tasks = [asyncio.create_task(_synthesize(sentence, voice, sem)) for sentence in sentences]
+    try:
+        for task in tasks:
+            yield await task
+    finally:
+        # Stop the rest if a sentence failed or the client went away
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def split_sentences(text: str) -> list[str]:
+    """
+    Split text after each '.', '!' or '?' that is followed by whitespace.
+    Pieces without a single word character ("...", "?!") are joined to the
+    sentence next to them, since Edge TTS returns no audio for them on their own:
+
+        >>> split_sentences("Wait... ... really? Yes.")
+        ['Wait... ...', 'really?', 'Yes.']
+    """
+    sentences: list[str] = []
+    for part in _SENTENCE_END.split(text.strip()):
+        if not part:
+            continue
+        if sentences and not (_HAS_WORD.search(part) and _HAS_WORD.search(sentences[-1])):
+            sentences[-1] += " " + part
+        else:
+            sentences.append(part)
+    return sentences
+
+
+async def _stream_voice(text: str, voice: str) -> AsyncIterator[bytes]:
+    global _waiting
+
+    _waiting += 1
+    try:
+        await _synthesis_slots.acquire()
+    finally:
+        _waiting -= 1
+
+    # The slot is held for exactly one Edge TTS call, and released however it ends
+    try:
+        # Reuse the shared pool when the app has opened one (see open_session)
+        communicate = edge_tts.Communicate(text=text, voice=voice, connector=_connector)
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                yield chunk["data"]
+    finally:
+        _synthesis_slots.release()
+
+
+async def _synthesize(text: str, voice: str, sem: asyncio.Semaphore) -> bytes:
+    async with sem:
+        buf = bytearray()
+        async for chunk in _stream_voice(text, voice):
+            buf.extend(chunk)
+        return bytes(buf)
+
 
 async def text_to_speech(text: str, lang: str = "en") -> bytes:
     """
@@ -46,17 +189,9 @@ async def text_to_speech(text: str, lang: str = "en") -> bytes:
     Returns:
         MP3 audio as bytes.
     """
-    voice = VOICE_MAP.get(lang, DEFAULT_VOICE)
-
-    # Write audio to a temp file, then read it back as bytes
-    with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as tmp:
-        tmp_path = tmp.name
+    # Collect audio chunks in memory as they arrive — no temp file needed
+    buf = bytearray()
+    async for chunk in stream_speech(text, lang):
+        buf.extend(chunk)
 
-    try:
-        tts = edge_tts.Communicate(text=text, voice=voice)
-        await tts.save(tmp_path)
-
-        with open(tmp_path, "rb") as f:
-            return f.read()
-    finally:
-        os.remove(tmp_path)  # Always clean up temp file
\ No newline at end of file
+    return bytes(buf)